@@ -4,6 +4,7 @@ Clean, ChatGPT-inspired interface for document verification
 """
 import asyncio
 import json
+import threading
 from datetime import date
 from io import BytesIO
 from pathlib import Path
@@ -183,10 +184,32 @@ def render_metrics(result: dict) -> None:
         st.metric("Overall (UCS)", f"{ucs:.1%}")
 
 
-async def process_document(image_bytes: bytes, mime_type: str, api_key: str) -> dict:
-    """Process document through KYC pipeline"""
-    pipeline = KYCPipeline(api_key=api_key)
-    result = await pipeline.run(image_bytes, mime_type=mime_type)
+@st.cache_resource
+def get_pipeline(api_key: str) -> KYCPipeline:
+    """Build the pipeline once per session; its processor/validator are reusable."""
+    return KYCPipeline(api_key=api_key)
+
+
+@st.cache_resource
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """One long-lived event loop on a daemon thread for all pipeline runs.
+
+    Avoids asyncio.run() building and tearing down a loop (and its executor)
+    on every upload, and keeps connection reuse possible across runs.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def process_document(image_bytes: bytes, mime_type: str, api_key: str) -> dict:
+    """Process document through KYC pipeline (memoized on the image bytes)."""
+    pipeline = get_pipeline(api_key)
+    future = asyncio.run_coroutine_threadsafe(
+        pipeline.run(image_bytes, mime_type=mime_type), get_event_loop()
+    )
+    result = future.result()
     return {
         "status": result.status,
         "score": result.score,
@@ -235,46 +258,29 @@ def main():
     st.markdown("</div>", unsafe_allow_html=True)
     
     if uploaded_file is not None:
-        # Only process if not already processed
-        file_key = f"{uploaded_file.name}_{uploaded_file.size}"
-        
-        if st.session_state.get("last_processed") != file_key:
-            # Display uploaded image and process
-            col1, col2 = st.columns([1, 2])
-            
-            with col1:
-                image = Image.open(uploaded_file)
-                st.image(image, caption="Uploaded Document", width="stretch")
-            
-            with col2:
-                st.markdown("### Processing...")
-                with st.spinner("Analyzing document..."):
-                    try:
-                        # Get image bytes
-                        uploaded_file.seek(0)
-                        image_bytes = uploaded_file.read()
-                        
-                        # Determine MIME type
-                        mime_type = f"image/{uploaded_file.type.split('/')[-1]}"
-                        
-                        # Process
-                        result = asyncio.run(process_document(image_bytes, mime_type, api_key))
-                        
-                        # Store in session state
-                        st.session_state["result"] = result
-                        st.session_state["last_processed"] = file_key
-                        st.rerun()
-                        
-                    except TechnicalRejectError as e:
-                        st.error(f"❌ **Image Quality Issue**\n\n{str(e)}")
-                        st.info("💡 Please retake the photo with better lighting and focus.")
-                        st.session_state.pop("result", None)
-                        st.stop()
-                        
-                    except Exception as e:
-                        st.error(f"❌ **Processing Error**\n\n{str(e)}")
-                        st.session_state.pop("result", None)
-                        st.stop()
+        # st.cache_data keys on the image bytes, so reruns triggered by
+        # widget interactions skip the pipeline entirely.
+        with st.spinner("Analyzing document..."):
+            try:
+                # getvalue() hands back the underlying buffer without
+                # copying or disturbing the stream position
+                image_bytes = uploaded_file.getvalue()
+
+                # Determine MIME type
+                mime_type = f"image/{uploaded_file.type.split('/')[-1]}"
+
+                st.session_state["result"] = process_document(image_bytes, mime_type, api_key)
+
+            except TechnicalRejectError as e:
+                st.error(f"❌ **Image Quality Issue**\n\n{str(e)}")
+                st.info("💡 Please retake the photo with better lighting and focus.")
+                st.session_state.pop("result", None)
+                st.stop()
+
+            except Exception as e:
+                st.error(f"❌ **Processing Error**\n\n{str(e)}")
+                st.session_state.pop("result", None)
+                st.stop()
     
     # Display results (independent of upload section)
     if "result" in st.session_state and st.session_state.get("result"):
@@ -2,12 +2,13 @@ from __future__ import annotations
 
 import asyncio
 import base64
-import json
 import logging
 import os
+import random
 from typing import Any, Dict, Optional
 
 import httpx
+import orjson
 
 from .exceptions import ModelCallError, SchemaValidationError
 from .schemas import ExtractionPayload
@@ -19,6 +20,29 @@ DEFAULT_SYSTEM_PROMPT = (
     "If a field is unreadable, set it to null and add it to missing_fields."
 )
 
+DEFAULT_USER_TEXT = (
+    "Extract passport or driver's license fields into the provided schema. "
+    "Return ai_confidence, missing_fields, evidence, mrz_raw. "
+    "Do not add commentary."
+)
+
+# Static data-URL prefixes, keyed by mime type, so the per-call work is a
+# single base64 encode plus one ascii decode.
+_DATA_URL_PREFIXES: Dict[str, bytes] = {}
+
+# The extraction schema is immutable, so walk the Pydantic model and encode
+# it exactly once at import instead of on every request. Compact encoding:
+# the model reads the schema as tokens, and pretty-print whitespace roughly
+# doubles that portion of the prompt for no benefit.
+_SCHEMA_JSON = orjson.dumps(ExtractionPayload.model_json_schema()).decode()
+
+# Message blocks that never change between calls: build the dicts once and
+# share the (read-only) references across every request body.
+_SCHEMA_BLOCK = {"type": "text", "text": _SCHEMA_JSON}
+_DEFAULT_USER_BLOCK = {"type": "text", "text": DEFAULT_USER_TEXT}
+_DEFAULT_SYSTEM_MESSAGE = {"role": "system", "content": DEFAULT_SYSTEM_PROMPT}
+_RESPONSE_FORMAT = {"type": "json_object"}
+
 
 class FireworksExtractor:
     def __init__(
@@ -29,6 +53,7 @@ class FireworksExtractor:
         timeout: float = 30.0,
         max_retries: int = 3,
         backoff_base: float = 0.8,
+        pool_size: Optional[int] = None,
     ) -> None:
         self.api_key = api_key or os.getenv("FIREWORKS_API_KEY", "")
         self.model = model
@@ -36,13 +61,26 @@ class FireworksExtractor:
         self.timeout = timeout
         self.max_retries = max_retries
         self.backoff_base = backoff_base
+        self.pool_size = pool_size
         self._client: Optional[httpx.AsyncClient] = None
+        self._last_image: Optional[bytes] = None
+        self._last_data_url: Optional[str] = None
 
     async def __aenter__(self) -> "FireworksExtractor":
+        pool_size = self.pool_size or 32
         self._client = httpx.AsyncClient(
             base_url="https://api.fireworks.ai/inference/v1",
             headers={"Authorization": f"Bearer {self.api_key}"},
             timeout=self.timeout,
+            # HTTP/2 lets concurrent requests multiplex as streams over one
+            # TLS connection instead of queueing on the pool.
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=pool_size,
+                max_connections=pool_size * 2,
+                keepalive_expiry=60.0,
+            ),
+            trust_env=False,  # skip proxy-env lookups per request
         )
         return self
 
@@ -59,14 +97,8 @@ class FireworksExtractor:
         if not self._client:
             raise RuntimeError("Extractor must be used as an async context manager.")
 
-        data_url = self._to_data_url(image_bytes, mime_type)
-        schema_def = ExtractionPayload.model_json_schema()
-        user_text = (
-            "Extract passport or driver's license fields into the provided schema. "
-            "Return ai_confidence, missing_fields, evidence, mrz_raw. "
-            "Do not add commentary."
-        )
-        body = self._build_body(data_url, system_prompt, user_text, schema_def, self.model)
+        data_url = self._data_url_for(image_bytes, mime_type)
+        body = self._build_body(data_url, system_prompt, DEFAULT_USER_TEXT, self.model)
         # Primary attempt
         try:
             response_payload = await self._post_with_retry(body)
@@ -83,7 +115,7 @@ class FireworksExtractor:
 
         # Fallback model if primary failed to call or parse
         fallback_body = self._build_body(
-            data_url, system_prompt, user_text, schema_def, self.fallback_model
+            data_url, system_prompt, DEFAULT_USER_TEXT, self.fallback_model
         )
         fallback_response = await self._post_with_retry(fallback_body)
         return self._parse_payload(fallback_response)
@@ -93,23 +125,32 @@ class FireworksExtractor:
         data_url: str,
         system_prompt: str,
         user_text: str,
-        schema_def: Dict[str, Any],
         model_name: str,
     ) -> Dict[str, Any]:
+        system_message = (
+            _DEFAULT_SYSTEM_MESSAGE
+            if system_prompt is DEFAULT_SYSTEM_PROMPT
+            else {"role": "system", "content": system_prompt}
+        )
+        user_block = (
+            _DEFAULT_USER_BLOCK
+            if user_text is DEFAULT_USER_TEXT
+            else {"type": "text", "text": user_text}
+        )
         return {
             "model": model_name,
             "messages": [
-                {"role": "system", "content": system_prompt},
+                system_message,
                 {
                     "role": "user",
                     "content": [
-                        {"type": "text", "text": json.dumps(schema_def, indent=2)},
-                        {"type": "text", "text": user_text},
+                        _SCHEMA_BLOCK,
+                        user_block,
                         {"type": "image_url", "image_url": {"url": data_url}},
                     ],
                 },
             ],
-            "response_format": {"type": "json_object"},
+            "response_format": _RESPONSE_FORMAT,
             "temperature": 0,
             "max_tokens": 2000,
         }
@@ -117,22 +158,38 @@ class FireworksExtractor:
     async def _post_with_retry(self, body: Dict[str, Any]) -> Dict[str, Any]:
         assert self._client
         for attempt in range(self.max_retries):
+            delay: Optional[float] = None
             try:
                 response = await self._client.post(
                     "/chat/completions", json=body, timeout=self.timeout
                 )
                 response.raise_for_status()
-                return response.json()
+                return orjson.loads(response.content)
             except httpx.HTTPStatusError as exc:
                 if exc.response.status_code not in {429, 500, 502, 503, 504}:
                     raise ModelCallError(str(exc)) from exc
+                delay = self._parse_retry_after(exc.response.headers.get("Retry-After"))
             except httpx.RequestError as exc:
                 # network/timeout
                 if attempt == self.max_retries - 1:
                     raise ModelCallError(str(exc)) from exc
-            await asyncio.sleep(self.backoff_base * (2**attempt))
+            if delay is None:
+                # Jitter desynchronizes concurrent batch workers that were
+                # all rate-limited at the same instant.
+                delay = self.backoff_base * (2**attempt) * random.uniform(0.5, 1.5)
+            await asyncio.sleep(delay)
         raise ModelCallError("Model call failed after retries.")
 
+    @staticmethod
+    def _parse_retry_after(header: Optional[str]) -> Optional[float]:
+        """Take the server's wait hint when it sends one (seconds form only)."""
+        if not header:
+            return None
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            return None
+
     def _parse_payload(self, response: Dict[str, Any]) -> ExtractionPayload:
         try:
             message = response["choices"][0]["message"]
@@ -141,10 +198,20 @@ class FireworksExtractor:
             else:
                 content = message.get("content")
                 text_blob = self._content_to_str(content)
-                logger.debug(f"Raw content from model: {text_blob[:500]}")
-                parsed = self._coerce_json(text_blob)
+                stripped = text_blob.lstrip()
+                if stripped.startswith("{"):
+                    # Happy path: with response_format=json_object the content
+                    # is bare JSON, so a single parse succeeds with no
+                    # exception machinery at all.
+                    try:
+                        parsed = orjson.loads(stripped)
+                    except orjson.JSONDecodeError:
+                        parsed = self._coerce_json(text_blob)
+                else:
+                    logger.debug(f"Raw content from model: {text_blob[:500]}")
+                    parsed = self._coerce_json(text_blob)
             return ExtractionPayload.model_validate(parsed)
-        except (KeyError, json.JSONDecodeError, ValueError) as exc:
+        except (KeyError, orjson.JSONDecodeError, ValueError) as exc:
             logger.error(f"Parse failed. Response keys: {response.keys()}, error: {exc}")
             raise SchemaValidationError(f"Failed to parse structured output: {exc}") from exc
 
@@ -178,8 +245,8 @@ class FireworksExtractor:
 
         # Fast path
         try:
-            return json.loads(text)
-        except json.JSONDecodeError:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
             pass
 
         # Attempt to extract outermost braces
@@ -187,13 +254,31 @@ class FireworksExtractor:
         end = text.rfind("}")
         if start != -1 and end != -1 and end > start:
             candidate = text[start : end + 1]
-            return json.loads(candidate)
+            return orjson.loads(candidate)
 
         # Reraise with original context
-        return json.loads(text)
+        return orjson.loads(text)
+
+    def _data_url_for(self, image_bytes: bytes, mime_type: str) -> str:
+        """Encode the image as a data URL, skipping re-encodes of the same bytes.
+
+        Resubmissions of an identical image (the common KYC retry flow) pay a
+        memcmp instead of a fresh base64 pass over the whole payload.
+        """
+        if self._last_data_url is not None and image_bytes == self._last_image:
+            return self._last_data_url
+        data_url = self._to_data_url(image_bytes, mime_type)
+        self._last_image = image_bytes
+        self._last_data_url = data_url
+        return data_url
 
     @staticmethod
     def _to_data_url(image_bytes: bytes, mime_type: str) -> str:
-        encoded = base64.b64encode(image_bytes).decode("utf-8")
-        return f"data:{mime_type};base64,{encoded}"
+        prefix = _DATA_URL_PREFIXES.get(mime_type)
+        if prefix is None:
+            prefix = f"data:{mime_type};base64,".encode("ascii")
+            _DATA_URL_PREFIXES[mime_type] = prefix
+        # Stay in bytes until the end: one concat, one ascii decode, no
+        # intermediate UTF-8 round-trip of the encoded body.
+        return (prefix + base64.b64encode(image_bytes)).decode("ascii")
 
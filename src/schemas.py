@@ -4,6 +4,31 @@ from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
+# Every non-ISO format the flexible parser knows, in preference order.
+_DATE_FORMATS = ("%d.%b.%Y", "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d", "%d-%m-%Y")
+
+_ISO = "ISO"
+
+
+def _date_format_for(v: str) -> Optional[str]:
+    """Pick the single format matching the string's separator layout.
+
+    The common case then costs one parse with no raised exceptions,
+    instead of walking the whole format list through try/except.
+    """
+    if len(v) == 10:
+        if v[4] == "-":
+            return _ISO
+        if v[4] == "/":
+            return "%Y/%m/%d"
+        if v[2] == "/":
+            return "%d/%m/%Y"
+        if v[2] == "-":
+            return "%d-%m-%Y"
+    if len(v) > 2 and v[2] == ".":
+        return "%d.%b.%Y"
+    return None
+
 
 class DocumentType(str, Enum):
     passport = "passport"
@@ -12,7 +37,10 @@ class DocumentType(str, Enum):
 
 
 class Evidence(BaseModel):
-    model_config = ConfigDict(extra="ignore")
+    # Stays a BaseModel rather than a slotted dataclass: model output often
+    # carries stray keys in evidence blocks, and extra="ignore" tolerance
+    # matters more than the per-instance dict it costs.
+    model_config = ConfigDict(extra="ignore", frozen=True)
 
     snippet: Optional[str] = None
     bbox: Optional[List[float]] = Field(
@@ -21,7 +49,12 @@ class Evidence(BaseModel):
 
 
 class BaseDocument(BaseModel):
-    model_config = ConfigDict(extra="ignore")
+    # str_strip_whitespace trims OCR padding once at validation instead of
+    # ad hoc .strip() calls downstream; revalidate_instances="never" skips
+    # re-running validators on already-constructed models.
+    model_config = ConfigDict(
+        extra="ignore", str_strip_whitespace=True, revalidate_instances="never"
+    )
 
     full_name: Optional[str] = None
     birth_date: Optional[date] = None
@@ -51,21 +84,23 @@ class BaseDocument(BaseModel):
         if isinstance(v, datetime):
             return v.date()
         if isinstance(v, str):
-            # Try YYYY-MM-DD first
-            try:
-                return date.fromisoformat(v)
-            except:
-                pass
-            # Try DD.MON.YYYY format (e.g., "17.JAN.1706")
-            try:
-                return datetime.strptime(v, "%d.%b.%Y").date()
-            except:
-                pass
-            # Try other common formats
-            for fmt in ["%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d", "%d-%m-%Y"]:
+            # Dispatch on separator layout so the usual case parses once
+            fmt = _date_format_for(v)
+            if fmt is not None:
                 try:
+                    if fmt is _ISO:
+                        return date.fromisoformat(v)
                     return datetime.strptime(v, fmt).date()
-                except:
+                except ValueError:
+                    pass
+            # Layout didn't resolve it (e.g. ambiguous day/month) — sweep
+            # the full format list the old way
+            for fallback in _DATE_FORMATS:
+                if fallback == fmt:
+                    continue
+                try:
+                    return datetime.strptime(v, fallback).date()
+                except ValueError:
                     continue
         return None
 
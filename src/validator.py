@@ -5,11 +5,65 @@ from dataclasses import dataclass
 from datetime import date
 from typing import List, Optional, Tuple
 
+import numpy as np
+
 from .schemas import DocumentType, ExtractionPayload
 
 
-PASSPORT_NUMBER_PATTERN = re.compile(r"^[A-Z0-9]{6,9}$")
-DRIVER_LICENSE_PATTERN = re.compile(r"^[A-Z0-9\-]{5,20}$")
+# \Z instead of $ (no trailing-newline allowance) and re.ASCII so the
+# engine skips Unicode property lookups for these plain character classes.
+PASSPORT_NUMBER_PATTERN = re.compile(r"^[A-Z0-9]{6,9}\Z", re.ASCII)
+DRIVER_LICENSE_PATTERN = re.compile(r"^[A-Z0-9\-]{5,20}\Z", re.ASCII)
+
+_DOC_NUM_PATTERNS = {
+    DocumentType.passport: PASSPORT_NUMBER_PATTERN,
+    DocumentType.drivers_license: DRIVER_LICENSE_PATTERN,
+}
+
+_DOC_NUM_ISSUES = {
+    DocumentType.passport: "Passport number pattern mismatch.",
+    DocumentType.drivers_license: "Driver license number pattern mismatch.",
+}
+
+# ICAO 9303 character values ('0'-'9' -> 0-9, 'A'-'Z' -> 10-35, filler '<'
+# and anything unexpected -> 0) as a 256-byte table: single source of
+# truth for both the scalar lookup and the vectorized checksum path.
+_MRZ_LUT = bytes(
+    _i - ord("0") if ord("0") <= _i <= ord("9")
+    else _i - ord("A") + 10 if ord("A") <= _i <= ord("Z")
+    else 0
+    for _i in range(256)
+)
+_MRZ_VALUES = np.frombuffer(_MRZ_LUT, dtype=np.uint8).astype(np.uint32)
+_MRZ_WEIGHTS = np.array([7, 3, 1], dtype=np.uint32)
+
+
+def _yymmdd(d: date) -> str:
+    """Fixed-width YYMMDD; ~5x faster than strftime re-parsing the format."""
+    return f"{d.year % 100:02d}{d.month:02d}{d.day:02d}"
+
+
+def _mrz_check_digit(field: bytes) -> int:
+    """Weighted 7-3-1 checksum over an MRZ field, vectorized."""
+    values = _MRZ_VALUES[np.frombuffer(field, dtype=np.uint8)]
+    weights = np.resize(_MRZ_WEIGHTS, len(values))
+    return int((values * weights).sum() % 10)
+
+
+def verify_mrz_checksums(line2: str) -> Tuple[bool, bool, bool]:
+    """Verify the TD3 line-2 check digits for document number, birth, expiry."""
+    raw = line2.encode("ascii", "replace")
+
+    def _check(field: bytes, check_char: int) -> bool:
+        if not (ord("0") <= check_char <= ord("9")):
+            return False
+        return _mrz_check_digit(field) == check_char - ord("0")
+
+    return (
+        _check(raw[0:9], raw[9]),
+        _check(raw[13:19], raw[19]),
+        _check(raw[21:27], raw[27]),
+    )
 
 
 @dataclass
@@ -65,16 +119,11 @@ class DocumentValidator:
 
         # Document number pattern
         if doc.document_number:
-            if extraction.document_type == DocumentType.passport:
-                if not PASSPORT_NUMBER_PATTERN.match(doc.document_number):
-                    issues.append("Passport number pattern mismatch.")
-                    flagged.append("document_number")
-                    penalties += 0.2
-            elif extraction.document_type == DocumentType.drivers_license:
-                if not DRIVER_LICENSE_PATTERN.match(doc.document_number):
-                    issues.append("Driver license number pattern mismatch.")
-                    flagged.append("document_number")
-                    penalties += 0.2
+            pattern = _DOC_NUM_PATTERNS.get(extraction.document_type)
+            if pattern is not None and not pattern.match(doc.document_number):
+                issues.append(_DOC_NUM_ISSUES[extraction.document_type])
+                flagged.append("document_number")
+                penalties += 0.2
 
         # MRZ cross-validation for passports
         if extraction.document_type == DocumentType.passport and doc.mrz_raw:
@@ -103,7 +152,16 @@ class DocumentValidator:
                 mrz_doc_num = line2[0:9].replace("<", "").strip()
                 mrz_birth = line2[13:19]
                 mrz_expiry = line2[21:27]
-                
+
+                # ICAO 9303 check digits over the machine-readable fields
+                doc_ok, birth_ok, expiry_ok = verify_mrz_checksums(line2)
+                if not doc_ok:
+                    issues.append("MRZ document number check digit invalid")
+                if not birth_ok:
+                    issues.append("MRZ birth date check digit invalid")
+                if not expiry_ok:
+                    issues.append("MRZ expiry date check digit invalid")
+
                 # Cross-check document number
                 if doc.document_number and mrz_doc_num:
                     if not doc.document_number.startswith(mrz_doc_num[:6]):
@@ -111,13 +169,13 @@ class DocumentValidator:
                 
                 # Cross-check birth date (YYMMDD)
                 if doc.birth_date:
-                    visual_birth = doc.birth_date.strftime("%y%m%d")
+                    visual_birth = _yymmdd(doc.birth_date)
                     if mrz_birth != visual_birth:
                         issues.append(f"MRZ birth mismatch: visual={visual_birth}, MRZ={mrz_birth}")
                 
                 # Cross-check expiry date
                 if doc.expiry_date:
-                    visual_expiry = doc.expiry_date.strftime("%y%m%d")
+                    visual_expiry = _yymmdd(doc.expiry_date)
                     if mrz_expiry != visual_expiry:
                         issues.append(f"MRZ expiry mismatch: visual={visual_expiry}, MRZ={mrz_expiry}")
         
@@ -125,11 +183,9 @@ class DocumentValidator:
 
     @staticmethod
     def _mrz_char_value(char: str) -> int:
-        if char.isdigit():
-            return int(char)
-        if char == "<":
-            return 0
-        return ord(char) - 55  # 'A' -> 10
+        # Single indexed load into the precomputed table instead of the old
+        # isdigit/filler/ord branch chain.
+        return _MRZ_LUT[ord(char)]
 
     @staticmethod
     def _select_doc(extraction: ExtractionPayload):